@@ -6,9 +6,12 @@ from prompt_toolkit.completion import WordCompleter
 
 import argparse
 import sys
+from typing import Dict, Tuple
 
 from profiler.controller import ProfilerController
-from profiler.sampler import DEFAULT_SAMPLING_TIMEOUT
+from profiler.sampler import (
+    DEFAULT_SAMPLING_TIMEOUT, DEFAULT_SAMPLER_BACKEND, SAMPLER_BACKENDS
+)
 from profiler.ui import pprint, prompt_session
 
 
@@ -17,7 +20,9 @@ CLI_COMMANDS = [
 ]
 
 
-def build_args_parser() -> argparse.ArgumentParser:
+def build_args_parser() -> Tuple[argparse.ArgumentParser,
+                                 Dict[str, argparse.ArgumentParser]]:
+    """Build CLI parser and return it with parsers of each CLI command."""
     parser = argparse.ArgumentParser(description="Profiler CLI")
     subparsers = parser.add_subparsers(dest="command")
 
@@ -33,6 +38,11 @@ def build_args_parser() -> argparse.ArgumentParser:
     start_parser.add_argument("-t", "--timeout", type=float,
                               help="Custom sampling timeout. Default is "
                               f"{DEFAULT_SAMPLING_TIMEOUT} s")
+    start_parser.add_argument("-b", "--backend",
+                              choices=list(SAMPLER_BACKENDS),
+                              help="Sampler backend used to capture call "
+                              "stacks. Default is "
+                              f"{DEFAULT_SAMPLER_BACKEND}")
 
     stop_parser = subparsers.add_parser("stop",  # noqa: F841
                                         help="Stop profiler.")
@@ -60,13 +70,30 @@ def build_args_parser() -> argparse.ArgumentParser:
     exit_parser = subparsers.add_parser("exit",  # noqa: F841
                                         help="Exit Profiler CLI.")
 
-    return parser
+    return parser, subparsers.choices
+
+
+def parse_command(user_input: str, parser: argparse.ArgumentParser,
+                  command_parsers: Dict[str, argparse.ArgumentParser]
+                  ) -> argparse.Namespace:
+    """
+    Parse CLI command with parser of this command only. Unknown commands
+    are parsed by the full *parser* to report an error.
+    """
+    command, _, arguments = user_input.partition(" ")
+    command_parser = command_parsers.get(command)
+    if command_parser is None:
+        return parser.parse_args(user_input.split())
+
+    args = command_parser.parse_args(arguments.split())
+    args.command = command
+    return args
 
 
 def run_cli_loop() -> None:
     """Handle and process profiler commands in infinite interaction loop."""
     profiler = ProfilerController()
-    parser = build_args_parser()
+    parser, command_parsers = build_args_parser()
 
     command_completer = WordCompleter(CLI_COMMANDS, ignore_case=True)
     session = PromptSession(completer=command_completer)
@@ -90,7 +117,7 @@ def run_cli_loop() -> None:
             if not user_input:
                 continue
 
-            args = parser.parse_args(user_input.split())
+            args = parse_command(user_input, parser, command_parsers)
             profiler.process_command(args)
         except SystemExit as e:
             if e.code != 0:
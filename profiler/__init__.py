@@ -1,4 +1,8 @@
 from .controller import ProfilerController
-from .sampler import Sampler
+from .sampler import (
+    Sampler, LLDBSampler, LLDBAPISampler, PySpySampler, ProcessMemorySampler
+)
+from .samples import SampleBuffer
 
-__all__ = ["ProfilerController", "Sampler"]
+__all__ = ["ProfilerController", "Sampler", "LLDBSampler", "LLDBAPISampler",
+           "PySpySampler", "ProcessMemorySampler", "SampleBuffer"]
@@ -3,31 +3,60 @@ from the CLI.
 """
 
 import argparse
-from math import sqrt
+import multiprocessing
+from multiprocessing.sharedctypes import Synchronized
+from multiprocessing.synchronize import Event
+import numpy as np
 from tabulate import tabulate
 import threading
-from typing import List, Set, Optional
+from typing import FrozenSet, List, Set, Optional
 import psutil
 import sys
 
-from .sampler import Sampler, DEFAULT_SAMPLING_TIMEOUT
+from .sampler import (
+    DEFAULT_SAMPLING_TIMEOUT, DEFAULT_SAMPLER_BACKEND, run_sampler
+)
+from .samples import MP_CONTEXT, SampleBuffer
+
+# Time in seconds given to the sampling process to close its backend session
+# (e.g. detach LLDB from the traced process) after it is asked to stop.
+SAMPLER_STOP_TIMEOUT: float = 5.0
+# Maximum time in seconds between two updates of function counts by the
+# watcher thread. Counts are updated at least twice per ring buffer length,
+# so samples are counted before they are overwritten.
+COUNTS_UPDATE_INTERVAL: float = 1.0
+
+RESULTS_HEADERS = ("Function Name", "Approximate execution time (s)")
 
 
 class ProfilerController:
     def __init__(self):
         self.running = False
         self.functions_to_profile: Set[str] = set()
+        # Immutable copy of *self.functions_to_profile* rebuilt on every
+        # change, so results are computed from a consistent set for free.
+        self.profile_set: FrozenSet[str] = frozenset()
         self.pid_to_trace: int = 0
-        self.sampler_instance: Sampler = None
-        self.sampling_thread: threading.Thread = None
+        self.samples: SampleBuffer = None
+        # Number of samples of each function (indexed by function id) among
+        # first *self.samples_read* samples.
+        self.function_counts = np.zeros(0, dtype=np.int64)
+        self.function_table: List[str] = []
+        self.samples_read = 0
+        self.results_lock = threading.Lock()
+        self.missed_deadlines: Synchronized = None
+        self.sampling_process: multiprocessing.Process = None
+        self.stop_event: Event = None
         self.sampling_timeout: float = DEFAULT_SAMPLING_TIMEOUT
+        self.sampler_backend: str = DEFAULT_SAMPLER_BACKEND
         self.controller_lock = threading.Lock()
 
     def process_command(self, args: argparse.Namespace) -> None:
         if args.command == "start":
             self.start(pid=args.pid,
                        functions_to_trace=args.func,
-                       sampling_timeout=args.timeout)
+                       sampling_timeout=args.timeout,
+                       backend=args.backend)
 
         elif args.command == "stop":
             self.stop()
@@ -53,10 +82,11 @@ class ProfilerController:
             print("Invalid command.")
 
     def start(self, pid: int, functions_to_trace: List[str],
-              sampling_timeout: Optional[float] = None) -> None:
+              sampling_timeout: Optional[float] = None,
+              backend: Optional[str] = None) -> None:
         """
         Launch a profiler for the specified process and set of functions with
-        selected sampling timeout.
+        selected sampling timeout and sampler backend.
 
         Args:
             pid (int): PID of process you want to profile.
@@ -65,6 +95,8 @@ class ProfilerController:
             sampling_timeout (float): Sampling timeout in seconds. Profiler
                 will take a sample of selected Python process one time in
                 *sampling_timeout* seconds.
+            backend (str): Name of sampler backend from *SAMPLER_BACKENDS*
+                used to capture call stacks of selected Python process.
         """
         if self.running:
             print("Profiler is already running!")
@@ -80,78 +112,122 @@ class ProfilerController:
         if sampling_timeout is not None:
             self.sampling_timeout = sampling_timeout
 
+        if backend is not None:
+            self.sampler_backend = backend
+
         self.add_functions_to_profile(functions_to_trace)
         print(
             f"Starting profiling process {pid} "
             f"for functions: {self.functions_to_profile}"
         )
 
-        # Start collecting samples in a separate thread
-        self.sampler_instance = Sampler(
-            self.pid_to_trace,
-            self.sampling_timeout
-        )
-        self.sampling_thread = threading.Thread(
-            target=self.sampler_instance.start_sample_loop
+        # Start collecting samples in a separate process, so sampling never
+        # competes with CLI for GIL.
+        self.samples = SampleBuffer()
+        self.function_counts = np.zeros(0, dtype=np.int64)
+        self.function_table = []
+        self.samples_read = 0
+        self.missed_deadlines = MP_CONTEXT.Value("Q", 0)
+        self.stop_event = MP_CONTEXT.Event()
+        self.sampling_process = MP_CONTEXT.Process(
+            target=run_sampler,
+            args=(self.sampler_backend, self.pid_to_trace,
+                  self.sampling_timeout, self.samples,
+                  self.missed_deadlines, self.stop_event)
         )
-        self.sampling_thread.daemon = True
-        self.sampling_thread.start()
+        self.sampling_process.daemon = True
+        self.sampling_process.start()
 
         watcher = threading.Thread(target=self._watch_sampler)
         watcher.daemon = True
         watcher.start()
 
     def _watch_sampler(self):
-        """Wait until sampler is stopped and then stop profiler."""
-        self.sampling_thread.join()
+        """
+        Add new samples to function counts until sampler is stopped and then
+        stop profiler.
+        """
+        sampling_process = self.sampling_process
+        update_interval = min(
+            COUNTS_UPDATE_INTERVAL,
+            self.samples.capacity * self.sampling_timeout / 2
+        )
+
+        while True:
+            sampling_process.join(update_interval)
+            if not sampling_process.is_alive():
+                break
+            self.update_function_counts()
 
         self.stop()
 
     def add_functions_to_profile(self, func_to_add: List[str]) -> None:
-        self.functions_to_profile.update(func_to_add)
+        # Names in function table of samples are interned too, so lookups
+        # of profiled functions are compared by identity.
+        self.functions_to_profile.update(map(sys.intern, func_to_add))
+        self.profile_set = frozenset(self.functions_to_profile)
         print("Sampling functions:", self.functions_to_profile)
 
     def remove_functions_from_profile(self, func_to_remove: List[str]) -> None:
         self.functions_to_profile.difference_update(func_to_remove)
+        self.profile_set = frozenset(self.functions_to_profile)
         print("Sampling functions:", self.functions_to_profile)
 
+    def update_function_counts(self) -> None:
+        """Add samples written since the last update to function counts."""
+        with self.results_lock:
+            _, function_ids, self.function_table, self.samples_read = (
+                self.samples.read_samples(self.samples_read)
+            )
+            counts = np.bincount(function_ids,
+                                 minlength=len(self.function_table))
+            counts[:len(self.function_counts)] += self.function_counts
+            self.function_counts = counts
+
     def print_results(self) -> None:
         """Get profiling results and print them in console."""
-        if not self.sampler_instance:
+        if self.samples is None:
             print("No sampling data available. Start profiler first.")
             return
 
-        function_counts = {}
-
-        function_names = list(self.functions_to_profile)
-        function_names.sort()
-        function_execution_times = ["No Data Available"] * len(function_names)
-
-        for entry in self.sampler_instance.get_samples():
-            fn = entry["function"]
-            if fn in self.functions_to_profile:
-                function_counts[fn] = function_counts.get(fn, 0) + 1
-
-        for fn, count in function_counts.items():
-            total_time = count * self.sampling_timeout
-            error = sqrt(count) * self.sampling_timeout
-            time_with_error = f"{round(total_time, 4)} ± {round(error, 4)}"
-
-            function_execution_times[
-                function_names.index(fn)
-            ] = time_with_error
-
-        results = {"Function Name": function_names,
-                   "Approximate execution time (s)": function_execution_times}
-        print(tabulate(results, headers="keys", tablefmt="rounded_outline"))
+        profile_set = self.profile_set
+
+        # One row per profiled function, rows of sampled ones are replaced
+        # with their execution time below.
+        function_names = sorted(profile_set)
+        rows = [(fn, "No Data Available") for fn in function_names]
+
+        self.update_function_counts()
+        counts = self.function_counts
+        function_table = self.function_table
+        dt = self.sampling_timeout
+        profiled_ids = [
+            function_id for function_id in np.flatnonzero(counts)
+            if function_table[function_id] in profile_set
+        ]
+        profiled_counts = counts[profiled_ids]
+        total_times = (profiled_counts * dt).tolist()
+        errors = (np.sqrt(profiled_counts) * dt).tolist()
+
+        function_rows = {fn: i for i, fn in enumerate(function_names)}
+        for function_id, total_time, error in zip(profiled_ids, total_times,
+                                                  errors):
+            fn = function_table[function_id]
+            rows[function_rows[fn]] = (fn, "%.4f ± %.4f" % (total_time,
+                                                            error))
+
+        print(tabulate(rows, headers=RESULTS_HEADERS,
+                       tablefmt="rounded_outline"))
 
     def print_status(self) -> None:
         """
         Print the following profiler info:
         - Is profiler running.
         - Is PID to trace exists.
-        - *self.sampling_thread*
+        - *self.sampling_process*
         - *self.sampling_timeout*
+        - *self.sampler_backend*
+        - Number of missed sampling deadlines.
         - *self.functions_to_profile*
         """
         print("===Profiler Status===")
@@ -159,8 +235,11 @@ class ProfilerController:
               "Profiler is stopped.")
         print(f"PID {self.pid_to_trace} exists:",
               psutil.pid_exists(self.pid_to_trace))
-        print("Sampling thread:", self.sampling_thread)
+        print("Sampling process:", self.sampling_process)
         print("Sampling timeout:", self.sampling_timeout)
+        print("Sampler backend:", self.sampler_backend)
+        if self.missed_deadlines is not None:
+            print("Missed sampling deadlines:", self.missed_deadlines.value)
         print("Sampling functions:", self.functions_to_profile)
         print("=====================")
 
@@ -172,4 +251,15 @@ class ProfilerController:
             self.running = False
             print("Profiler stopped.")
 
+        # Let the sampler finish the current sample and close its backend
+        # session, so the results include every sample it has taken.
+        self.stop_event.set()
+        self.sampling_process.join(SAMPLER_STOP_TIMEOUT)
+        if self.sampling_process.is_alive():
+            # Backend hangs (e.g. LLDB never answers), kill the sampler so it
+            # doesn't stay attached to the traced process.
+            self.sampling_process.terminate()
+            self.sampling_process.join()
+        self.samples.unlink()
+
         self.print_results()
@@ -0,0 +1,39 @@
+"""LLDB commands used by LLDB sampler. The module is loaded into the LLDB
+session with `command script import`, it is not imported by the profiler.
+"""
+
+import cpython_lldb
+
+# Native functions of CPython that evaluate Python frames.
+EVAL_FRAME_FUNCTIONS = ("_PyEval_EvalFrameDefault", "PyEval_EvalFrameEx")
+
+
+def py_leaf_frame(debugger, command, exe_ctx, result, internal_dict):
+    """
+    Print the innermost Python frame of the selected thread in `py-bt`
+    format: File "<path>", line <N>, in <function>
+
+    Unlike `py-bt`, native frames are walked only up to the first eval
+    frame and no source code is read. If Python frame of the first eval
+    frame can't be decoded, outer frames are not tried, so the sample is
+    not credited to a caller.
+    """
+    thread = debugger.GetSelectedTarget().GetProcess().GetSelectedThread()
+
+    frame = thread.GetSelectedFrame()
+    while frame:
+        if frame.name in EVAL_FRAME_FUNCTIONS:
+            pyframe = cpython_lldb.PyFrameObject.from_frame(frame)
+            if pyframe is not None:
+                result.AppendMessage(pyframe.to_pythonlike_string())
+                return
+            break
+        frame = frame.get_parent_frame()
+
+    result.AppendMessage("No Python traceback found")
+
+
+def __lldb_init_module(debugger, internal_dict):
+    debugger.HandleCommand(
+        f"command script add -f {__name__}.py_leaf_frame py-leaf-frame"
+    )
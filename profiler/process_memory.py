@@ -0,0 +1,188 @@
+"""Reading of CPython interpreter state straight from memory of a running
+Python process, without stopping or signalling it.
+"""
+
+import ctypes
+import mmap
+import os
+import re
+import struct
+from typing import Dict, NamedTuple, Optional, Tuple
+
+
+class PythonOffsets(NamedTuple):
+    """Offsets (in bytes) of CPython struct fields used to find the running
+    function of the main thread.
+    """
+    interpreters_head: int    # _PyRuntimeState.interpreters.head
+    tstate_head: int          # PyInterpreterState.tstate_head
+    tstate_next: int          # PyThreadState.next
+    tstate_frame: int         # PyThreadState.frame
+    frame_code: int           # PyFrameObject.f_code
+    code_name: int            # PyCodeObject.co_name
+    unicode_length: int       # PyASCIIObject.length
+    unicode_state: int        # PyASCIIObject.state
+    ascii_data: int           # sizeof(PyASCIIObject)
+    compact_data: int         # sizeof(PyCompactUnicodeObject)
+
+
+# Offsets for 64-bit builds of CPython. Frames were reworked in 3.11, so only
+# versions with the classic PyFrameObject chain are supported.
+_OFFSETS_3_8_TO_3_10 = PythonOffsets(
+    interpreters_head=32,
+    tstate_head=8,
+    tstate_next=8,
+    tstate_frame=24,
+    frame_code=32,
+    code_name=112,
+    unicode_length=16,
+    unicode_state=32,
+    ascii_data=48,
+    compact_data=72,
+)
+PYTHON_OFFSETS: Dict[Tuple[int, int], PythonOffsets] = {
+    (3, 8): _OFFSETS_3_8_TO_3_10,
+    (3, 9): _OFFSETS_3_8_TO_3_10,
+    (3, 10): _OFFSETS_3_8_TO_3_10,
+}
+
+_PYTHON_VERSION_RE = re.compile(r"python(\d)\.(\d+)")
+
+_ELF_HEADER = struct.Struct("<16xHHIQQQIHHHHHH")
+_ELF_PROGRAM_HEADER = struct.Struct("<IIQQQQQQ")
+_ELF_SECTION_HEADER = struct.Struct("<IIQQQQIIQQ")
+_ELF_SYMBOL = struct.Struct("<IBBHQQ")
+_PT_LOAD = 1
+_SHT_SYMTAB = 2
+_SHT_DYNSYM = 11
+
+
+class _IOVec(ctypes.Structure):
+    _fields_ = [("iov_base", ctypes.c_void_p), ("iov_len", ctypes.c_size_t)]
+
+
+_libc = ctypes.CDLL(None, use_errno=True)
+_process_vm_readv = _libc.process_vm_readv
+_process_vm_readv.argtypes = [
+    ctypes.c_int, ctypes.POINTER(_IOVec), ctypes.c_ulong,
+    ctypes.POINTER(_IOVec), ctypes.c_ulong, ctypes.c_ulong,
+]
+_process_vm_readv.restype = ctypes.c_ssize_t
+
+
+def read_process_memory(pid: int, address: int, size: int) -> bytes:
+    """Read *size* bytes at *address* of process *pid* with a single
+    `process_vm_readv` syscall.
+    """
+    buffer = ctypes.create_string_buffer(size)
+    local = _IOVec(ctypes.cast(buffer, ctypes.c_void_p), size)
+    remote = _IOVec(address, size)
+
+    read = _process_vm_readv(pid, ctypes.byref(local), 1,
+                             ctypes.byref(remote), 1, 0)
+    if read != size:
+        errno = ctypes.get_errno()
+        raise OSError(errno, f"Failed to read {size} bytes at "
+                      f"{address:#x} of process {pid}: "
+                      f"{os.strerror(errno)}")
+    return buffer.raw
+
+
+def read_pointer(pid: int, address: int) -> int:
+    return int.from_bytes(read_process_memory(pid, address, 8), "little")
+
+
+def find_elf_symbol(path: str, symbol: str) -> Optional[Tuple[int, int]]:
+    """
+    Find *symbol* in symbol tables of 64-bit ELF file.
+
+    Returns:
+        (Optional[Tuple[int, int]]): Value of the symbol and virtual address
+            of the first loadable segment, or None if symbol is not found.
+    """
+    with open(path, "rb") as f, \
+            mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as elf:
+        if elf[:5] != b"\x7fELF\x02":
+            return None
+
+        (_, _, _, _, e_phoff, e_shoff, _, _, e_phentsize, e_phnum,
+         e_shentsize, e_shnum, _) = _ELF_HEADER.unpack_from(elf)
+
+        first_load_address = min(
+            p_vaddr
+            for p_type, _, _, p_vaddr, *_ in (
+                _ELF_PROGRAM_HEADER.unpack_from(elf, e_phoff + i * e_phentsize)
+                for i in range(e_phnum)
+            )
+            if p_type == _PT_LOAD
+        )
+        # Segments are mapped from page boundary.
+        first_load_address -= first_load_address % mmap.PAGESIZE
+
+        sections = [
+            _ELF_SECTION_HEADER.unpack_from(elf, e_shoff + i * e_shentsize)
+            for i in range(e_shnum)
+        ]
+        name_re = re.compile(re.escape(symbol.encode()) + b"\0")
+        for _, sh_type, _, _, sh_offset, sh_size, sh_link, *_ in sections:
+            if sh_type not in (_SHT_SYMTAB, _SHT_DYNSYM):
+                continue
+
+            # Find symbol name in string table first, so only integer
+            # comparisons are needed to find its entry. Linker may store the
+            # name as a suffix of a longer name, so every occurrence counts.
+            strtab_offset, strtab_size = sections[sh_link][4:6]
+            strtab = elf[strtab_offset:strtab_offset + strtab_size]
+            name_indexes = {m.start() for m in name_re.finditer(strtab)}
+            if not name_indexes:
+                continue
+
+            for st_name, _, _, _, st_value, _ in _ELF_SYMBOL.iter_unpack(
+                elf[sh_offset:sh_offset + sh_size]
+            ):
+                if st_name in name_indexes:
+                    return st_value, first_load_address
+
+    return None
+
+
+def find_python_runtime(pid: int) -> Tuple[int, Tuple[int, int]]:
+    """
+    Find address of `_PyRuntime` in memory of Python process *pid* and
+    version of its interpreter.
+
+    `_PyRuntime` is looked up in the executable itself (static builds) and in
+    loaded `libpython` library (shared builds).
+    """
+    executable = os.readlink(f"/proc/{pid}/exe")
+    candidates = [executable]
+    load_addresses: Dict[str, int] = {}
+
+    with open(f"/proc/{pid}/maps") as maps:
+        for line in maps:
+            fields = line.split(maxsplit=5)
+            if len(fields) < 6:
+                continue
+            path = fields[5].strip()
+            if int(fields[2], 16) != 0 or path in load_addresses:
+                continue
+            load_addresses[path] = int(fields[0].split("-")[0], 16)
+            if "libpython" in os.path.basename(path):
+                candidates.append(path)
+
+    for path in reversed(candidates):
+        version_match = _PYTHON_VERSION_RE.search(os.path.basename(path))
+        if path not in load_addresses or not version_match:
+            continue
+
+        # Read the file as seen from the traced process, it may run in
+        # another mount namespace.
+        found = find_elf_symbol(f"/proc/{pid}/root{path}", "_PyRuntime")
+        if found:
+            value, first_load_address = found
+            address = load_addresses[path] - first_load_address + value
+            version = (int(version_match[1]), int(version_match[2]))
+            return address, version
+
+    raise RuntimeError(f"_PyRuntime symbol not found in process {pid}. "
+                       "Is it a Python process?")
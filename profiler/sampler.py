@@ -1,92 +1,258 @@
 """Sampler interface that handles sampling of a running Python process using
-LLDB to collect call stack traces.
+py-spy or LLDB to collect call stack traces.
 """
 
+from abc import ABC, abstractmethod
+import asyncio
+import functools
+from multiprocessing.sharedctypes import Synchronized
+from multiprocessing.synchronize import Event
 import time
-from typing import List, Dict, Union
-import psutil
+from typing import Optional, Tuple
+import json
+import os
 import re
-import subprocess
-import threading
+import shutil
+
+from .process_memory import (
+    PYTHON_OFFSETS, find_python_runtime, read_pointer, read_process_memory
+)
+from .samples import SampleBuffer
+
+# LLDB Python bindings are optional and load liblldb, so they are imported
+# only by LLDB API sampler on the start of its session.
+cpython_lldb = None
+lldb = None
 
 
 DEFAULT_SAMPLING_TIMEOUT: float = 0.02  # In seconds
+# Real-time priority of the sampling process, if it is allowed to raise it.
+SAMPLER_FIFO_PRIORITY: int = 10
+
+# LLDB prints the prompt (followed by echoed command) before each command.
+_LLDB_PROMPT = b"(lldb)"
+# Maximum number of bytes read from LLDB stdout at once.
+_LLDB_READ_SIZE = 65536
+# LLDB script with `py-leaf-frame` command, that prints only the innermost
+# frame of `py-bt` output.
+_LLDB_COMMANDS_SCRIPT = os.path.join(os.path.dirname(__file__),
+                                     "lldb_commands.py")
+# Commands to stop the traced process, print its running Python frame and
+# resume.
+_LLDB_SAMPLE_COMMANDS = (b"process signal SIGINT\npy-leaf-frame\n"
+                         b"process continue\n")
+
+# Frame line of `py-bt` output: File "<path>", line <N>, in <function>
+_PY_BT_FRAME_MARKER = b'File "'
+_PY_BT_LINE_RE = re.compile(rb'^\s*File "([^"]+)", line \d+, in (.+)$',
+                            re.MULTILINE)
+# Number of distinct LLDB outputs with their parsed function names kept.
+_PARSED_STACKS_CACHE_SIZE = 128
+
+# Encodings of compact `str` object data by its kind (bytes per character).
+_UNICODE_KIND_ENCODINGS = {1: "latin-1", 2: "utf-16-le", 4: "utf-32-le"}
 
 
-class Sampler:
-    def __init__(self, pid_to_trace: int, sampling_timeout: float):
+class Sampler(ABC):
+    """
+    Base sampler that runs the sampling loop and writes collected samples to
+    *samples* buffer shared with the profiler controller.
+
+    Backends override *start_debugger_session*, *stop_debugger_session* and
+    *get_name_of_running_function* to capture the running function of the
+    traced process.
+    """
+
+    def __init__(self, pid_to_trace: int, sampling_timeout: float,
+                 samples: SampleBuffer,
+                 missed_deadlines: Synchronized, stop_event: Event):
         self.pid_to_trace = pid_to_trace
         self.sampling_timeout = sampling_timeout
-        self.is_running = False
-        self.samples: List[Dict[float, str]] = []
-        self.samples_lock = threading.Lock()
-        self.lldb_instance = None
+        # Set by the profiler controller to stop sampling.
+        self.stop_event = stop_event
+        self.samples = samples
+        # Number of samples that took longer than *sampling_timeout*.
+        self.missed_deadlines = missed_deadlines
 
     def start_sample_loop(self) -> None:
+        """Run *sample_loop* in a new event loop until it is finished."""
+        self.set_realtime_scheduling()
+        asyncio.run(self.sample_loop())
+
+    def set_realtime_scheduling(self) -> None:
         """
-        Start main sampling loop. Getting a sample every
-        *self.sampling_timeout* seconds.
+        Pin the sampling process to the last available CPU core and run it
+        with `SCHED_FIFO` policy, so samples are not delayed by other
+        processes. Linux only, skipped if not permitted (e.g. container
+        without `CAP_SYS_NICE`).
+
+        The process is pinned only when it gets `SCHED_FIFO`: at normal
+        priority a single shared core (inherited by spawned LLDB/py-spy
+        processes too) would only delay samples more.
+        """
+        if not hasattr(os, "sched_setscheduler"):
+            return
+
+        try:
+            os.sched_setscheduler(
+                0, os.SCHED_FIFO, os.sched_param(SAMPLER_FIFO_PRIORITY)
+            )
+        except PermissionError:
+            return
+
+        os.sched_setaffinity(0, {max(os.sched_getaffinity(0))})
+
+    async def sample_loop(self) -> None:
+        """
+        Main sampling loop. Getting a sample every *self.sampling_timeout*
+        seconds.
 
         Loop looks like this:
-        1. A permanent LLDB session is started.
-        2. while running:
+        1. A backend session is started (e.g. a permanent LLDB session).
+        2. while *self.stop_event* is not set:
             - Check if tracing process is exist.
-            - Suspend thread via LLDB.
-            - Capture current running Python function.
-            - Resume thread.
-            - Sleep for *self.sampling_timeout* milliseconds
-        3. Exit LLDB
+            - Capture current running Python function via backend.
+            - Sleep until the next sample is due. Samples are scheduled
+              every *self.sampling_timeout* seconds from the loop start, so
+              time spent on sampling doesn't stretch the sampling period.
+              Late samples restart the schedule from now.
+        3. Stop backend session (e.g. exit LLDB)
         """
-        self.is_running = True
-        self.start_debugger_session()
+        await self.start_debugger_session()
 
-        while self.is_running:
-            if not psutil.pid_exists(self.pid_to_trace):
+        dt = self.sampling_timeout
+        next_deadline = time.monotonic()
+
+        while not self.stop_event.is_set():
+            if not self.is_traced_process_alive():
                 break
 
-            sample = self.get_name_of_running_function()
-            with self.samples_lock:
-                self.samples.append(sample)
+            timestamp, function_name = (
+                await self.get_name_of_running_function()
+            )
+            self.add_sample(timestamp, function_name)
 
-            # TODO: make async?
-            time.sleep(self.sampling_timeout)
+            next_deadline += dt
+            sleep_for = next_deadline - time.monotonic()
+            if sleep_for > 0:
+                await asyncio.sleep(sleep_for)
+            else:
+                # Sampling is behind schedule. Start the schedule over
+                # instead of taking a burst of samples to catch up, as
+                # samples taken back to back overweight the function
+                # running at that moment.
+                self.missed_deadlines.value += 1
+                next_deadline = time.monotonic()
 
-        self.lldb_instance.stdin.write("detach\n")
-        self.lldb_instance.stdin.write("exit\n")
-        self.lldb_instance.stdin.flush()
+        await self.stop_debugger_session()
 
         return
 
-    def start_debugger_session(self) -> None:
+    def is_traced_process_alive(self) -> bool:
+        """Check if traced process exists with a single no-op signal."""
+        try:
+            os.kill(self.pid_to_trace, 0)
+        except ProcessLookupError:
+            return False
+        except PermissionError:
+            # Process exists, but belongs to another user.
+            return True
+        return True
+
+    async def start_debugger_session(self) -> None:
+        """Prepare backend for sampling the traced process."""
+
+    async def stop_debugger_session(self) -> None:
+        """Release everything acquired in *start_debugger_session*."""
+
+    @abstractmethod
+    async def get_name_of_running_function(self) -> Tuple[float, str]:
+        """Return timestamp of sampling and name of the running function."""
+
+    def add_sample(self, timestamp: float, function_name: str) -> None:
+        """Write sample to buffer shared with the profiler controller."""
+        self.samples.add_sample(timestamp, function_name)
+
+
+class LLDBSampler(Sampler):
+    """Sampler that stops the traced process via LLDB and reads its Python
+    frame printed in `py-bt` format.
+    """
+
+    async def start_debugger_session(self) -> None:
         # Run LLDB and attach to the target process.
-        # We use subprocess.Popen to create a permanent interactive session.
-        self.lldb_instance = subprocess.Popen(
-            ["lldb", "-p", str(self.pid_to_trace), "--local-lldbinit"],
-            stdin=subprocess.PIPE,
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
-            text=True,
+        # We create a permanent interactive session and talk to it over
+        # non-blocking pipes.
+        self.lldb_instance = await asyncio.create_subprocess_exec(
+            "lldb", "-p", str(self.pid_to_trace), "--local-lldbinit",
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
         )
+        # LLDB output that is read, but not consumed by *read_until_prompt*.
+        self.lldb_output_buffer = bytearray()
+        # The traced process usually stays on the same line for many samples
+        # and prints the same frame, so parsed frames are cached.
+        self.parse_cached_python_stack = functools.lru_cache(
+            maxsize=_PARSED_STACKS_CACHE_SIZE
+        )(self.parse_python_stack)
         # Waiting for the LLDB to be ready to obtain new command.
+        await self.read_until_prompt()
+
+        await self.send_command(
+            f'command script import "{_LLDB_COMMANDS_SCRIPT}"\n'.encode()
+        )
+        await self.read_until_prompt()
+
+    async def stop_debugger_session(self) -> None:
+        self.lldb_instance.stdin.write(b"detach\n")
+        self.lldb_instance.stdin.write(b"exit\n")
+        await self.lldb_instance.stdin.drain()
+        await self.lldb_instance.wait()
+
+    async def send_command(self, command: bytes) -> None:
+        self.lldb_instance.stdin.write(command)
+        await self.lldb_instance.stdin.drain()
+
+    async def read_until_prompt(self) -> bytes:
+        """
+        Read LLDB output up to the next prompt, prompt is dropped.
+
+        Output is read in big chunks into *self.lldb_output_buffer* and only
+        newly read bytes are scanned for the prompt.
+        """
+        buffer = self.lldb_output_buffer
+        scan_from = 0
+
         while True:
-            line = self.lldb_instance.stdout.readline()
-            if "(lldb)" in line:
-                break
+            prompt_start = buffer.find(_LLDB_PROMPT, scan_from)
+            if prompt_start >= 0:
+                output = bytes(buffer[:prompt_start])
+                del buffer[:prompt_start + len(_LLDB_PROMPT)]
+                return output
 
-    def get_name_of_running_function(self) -> Dict[str, Union[float, str]]:
+            # Prompt may be split between two chunks.
+            scan_from = max(0, len(buffer) - len(_LLDB_PROMPT) + 1)
+            chunk = await self.lldb_instance.stdout.read(_LLDB_READ_SIZE)
+            if not chunk:
+                raise EOFError("LLDB session is closed.")
+            buffer += chunk
+
+    async def get_name_of_running_function(self) -> Tuple[float, str]:
         """
         Capture Python process stack frame and get last function from it (this
         function is currently running).
 
         1. Interrupts the execution of the target process with
             "process signal SIGINT" command (aka. Ctrl-C).
-        2. Executes the `py-bt` command to retrieve the Python stack.
+        2. Executes the `py-leaf-frame` command to retrieve the innermost
+            frame of the Python stack (see *lldb_commands.py*).
         3. Continues the process execution with the `process continue` command.
 
         Returns:
-            (Dict[str, Union[float, str]]): A dictionary with:
-                "timestamp": timestamp of sampling (float)
-                "function": name of the currently running function (str)
+            (Tuple[float, str]): A tuple with:
+                timestamp of sampling (float)
+                name of the currently running function (str)
         """
         timestamp = time.time()
 
@@ -95,65 +261,378 @@ class Sampler:
         # Process 16568 exited with status = 0 (0x00000000)
 
         try:
-            # Stop program via LLDB
-            self.lldb_instance.stdin.write("process signal SIGINT\n")
-            self.lldb_instance.stdin.flush()
-            while True:
-                line = self.lldb_instance.stdout.readline()
-                if "(lldb)" in line:
-                    break
-
-            self.lldb_instance.stdin.write("py-bt\n")
-            self.lldb_instance.stdin.flush()
-            output_lines = []
-            while True:
-                line = self.lldb_instance.stdout.readline()
-                if "(lldb)" in line:
-                    break
-
-            self.lldb_instance.stdin.write("process continue\n")
-            self.lldb_instance.stdin.flush()
-            # TODO: understand WTH is going on with this .... stdout??? :>
-            # Idk how, but we get `py-bt` output after `continue` command
-            # execution. Maybe we should make continue after attaching or make
-            # sample and continue.
-            while True:
-                line = self.lldb_instance.stdout.readline()
-                if "(lldb)" in line:
-                    break
-                output_lines.append(line)
-            decoded = "".join(output_lines)
-            function_name = self.parse_python_stack(decoded)
+            # LLDB executes commands from stdin one by one, so all of them
+            # are sent at once to make a single write per sample.
+            await self.send_command(_LLDB_SAMPLE_COMMANDS)
+            # Skip prompts of `process signal` and `py-leaf-frame` commands.
+            await self.read_until_prompt()
+            await self.read_until_prompt()
+            # LLDB echoes every command after the prompt, and output of a
+            # command follows its echo. So the frame is everything
+            # before the prompt of `process continue` command.
+            output = await self.read_until_prompt()
+            function_name = self.parse_cached_python_stack(output)
         except Exception as e:
             print(f"Error capturing sample with lldb: {e}")
             function_name = "Unknown"
 
-        return {"timestamp": timestamp, "function": function_name}
+        return timestamp, function_name
 
-    def parse_python_stack(self, py_bt_output: str) -> str:
+    def parse_python_stack(self, py_bt_output: bytes) -> str:
         """
         Parses the LLDB output of the py-bt command and returns the
         function name, in which the execution is currently in progress.
 
+        Output is parsed as raw bytes, only the function name is decoded.
+
         Args:
-            py_bt_output (str): Output of py-bt program.
+            py_bt_output (bytes): Output of py-bt program.
 
         Returns:
             str: Name of Python-function that currently running.
         """
-        pattern = re.compile(r'^\s*File "([^"]+)", line \d+, in (.+)$')
-        matches = []
+        # The innermost frame is printed last, so scan from the bottom and
+        # stop at the first frame line.
+        end = len(py_bt_output)
+        while True:
+            marker = py_bt_output.rfind(_PY_BT_FRAME_MARKER, 0, end)
+            if marker < 0:
+                return "No function detected."
 
-        for line in py_bt_output.splitlines():
-            m = pattern.search(line)
+            line_start = py_bt_output.rfind(b"\n", 0, marker) + 1
+            m = _PY_BT_LINE_RE.match(py_bt_output, line_start)
             if m:
-                func = m.group(2).strip()
-                matches.append(func)
+                return m.group(2).strip().decode("utf-8", "replace")
+            end = marker
+
+
+class LLDBAPISampler(Sampler):
+    """
+    Sampler that drives LLDB in-process via its Python API (`lldb` module).
+
+    The traced process is stopped and continued with *lldb.SBProcess* calls,
+    and the running function is read from the `PyFrameObject` of the
+    innermost eval frame with `cpython_lldb`, so neither commands nor `py-bt`
+    output parsing are needed.
+    """
+
+    EVAL_FRAME_FUNCTIONS = ("_PyEval_EvalFrameDefault", "PyEval_EvalFrameEx")
+
+    async def start_debugger_session(self) -> None:
+        global cpython_lldb, lldb
+        try:
+            import cpython_lldb
+            import lldb
+        except ImportError:
+            raise RuntimeError("LLDB Python modules are not available. "
+                               "Install LLDB Python bindings or use another "
+                               "sampler backend.")
+
+        self.debugger = lldb.SBDebugger.Create()
+        # Asynchronous mode is required: in synchronous mode Continue()
+        # blocks until the traced process stops again.
+        self.debugger.SetAsync(True)
+        self.listener = self.debugger.GetListener()
+
+        error = lldb.SBError()
+        self.target = self.debugger.CreateTarget("")
+        self.process = self.target.AttachToProcessWithID(
+            self.listener, self.pid_to_trace, error
+        )
+        if error.Fail():
+            raise RuntimeError(f"Failed to attach to process "
+                               f"{self.pid_to_trace}: {error}")
+        if not self.wait_for_process_state(lldb.eStateStopped):
+            raise RuntimeError(f"Process {self.pid_to_trace} did not stop "
+                               "after attach.")
+
+        if not any(self.target.FindFunctions(name).GetSize()
+                   for name in self.EVAL_FRAME_FUNCTIONS):
+            raise RuntimeError(f"Symbol {self.EVAL_FRAME_FUNCTIONS[0]} not "
+                               "found. Are Python debug symbols installed?")
+
+        # Process is stopped after attach, let it run until the first sample.
+        self.process.Continue()
+
+    async def stop_debugger_session(self) -> None:
+        self.process.Detach()
+        lldb.SBDebugger.Destroy(self.debugger)
+
+    def wait_for_process_state(self, state: int,
+                               timeout: int = 1) -> bool:
+        """
+        Wait until traced process gets into *state*.
 
-        if matches:
-            return matches[-1]
+        Returns:
+            bool: False if process did not get into *state* in *timeout*
+                seconds.
+        """
+        event = lldb.SBEvent()
+        while self.listener.WaitForEvent(timeout, event):
+            if lldb.SBProcess.GetStateFromEvent(event) == state:
+                return True
+        return False
+
+    def drop_process_events(self) -> None:
+        """Drop state events that Stop() and Continue() queue up."""
+        event = lldb.SBEvent()
+        while self.listener.GetNextEvent(event):
+            pass
+
+    async def get_name_of_running_function(self) -> Tuple[float, str]:
+        """
+        Capture Python process stack frame and get last function from it (this
+        function is currently running).
+
+        1. Stops the traced process with *SBProcess.Stop()*.
+        2. Finds innermost eval frame of selected thread and reads
+            `co_name` of its `PyFrameObject` with `cpython_lldb`.
+        3. Continues the traced process with *SBProcess.Continue()*.
+
+        Returns:
+            (Tuple[float, str]): A tuple with:
+                timestamp of sampling (float)
+                name of the currently running function (str)
+        """
+        timestamp = time.time()
+
+        try:
+            self.process.Stop()
+            try:
+                function_name = self.read_running_function()
+            finally:
+                self.process.Continue()
+                self.drop_process_events()
+        except Exception as e:
+            print(f"Error capturing sample with lldb: {e}")
+            function_name = "Unknown"
+
+        return timestamp, function_name
+
+    def read_running_function(self) -> str:
+        thread = self.process.GetSelectedThread()
+
+        for frame in thread:
+            if frame.name not in self.EVAL_FRAME_FUNCTIONS:
+                continue
+
+            # Only the innermost eval frame runs the current function. If its
+            # frame object can't be found (even with `cpython_lldb`
+            # fallbacks for optimized builds), outer frames would credit the
+            # sample to a caller.
+            pyframe = cpython_lldb.PyFrameObject.from_frame(frame)
+            if pyframe is None:
+                break
+            return cpython_lldb.PyObject.from_value(
+                pyframe.co.child("co_name")
+            ).value
+
+        return "No function detected."
+
+
+class PySpySampler(Sampler):
+    """
+    Sampler that reads the call stack of the traced process with `py-spy`.
+
+    py-spy reads the interpreter state straight from the memory of the traced
+    process, so the process is never suspended while the sample is taken.
+    """
+
+    async def start_debugger_session(self) -> None:
+        py_spy = shutil.which("py-spy")
+        if py_spy is None:
+            raise RuntimeError("py-spy is not found. Install py-spy or use "
+                               "another sampler backend.")
+
+        self.py_spy_command = [
+            py_spy, "dump", "--pid", str(self.pid_to_trace),
+            "--json", "--nonblocking"
+        ]
+        # py-spy is spawned for every sample, so make sure once that it can
+        # read the traced process (e.g. ptrace is permitted) instead of
+        # failing every sample of the session.
+        await self.run_py_spy_dump()
+
+    async def get_name_of_running_function(self) -> Tuple[float, str]:
+        """
+        Capture Python process stack with `py-spy dump` and get the innermost
+        function from it (this function is currently running).
+
+        Returns:
+            (Tuple[float, str]): A tuple with:
+                timestamp of sampling (float)
+                name of the currently running function (str)
+        """
+        timestamp = time.time()
+
+        try:
+            function_name = self.parse_py_spy_dump(
+                await self.run_py_spy_dump()
+            )
+        except (OSError, RuntimeError, ValueError) as e:
+            print(f"Error capturing sample with py-spy: {e}")
+            function_name = "Unknown"
+
+        return timestamp, function_name
+
+    async def run_py_spy_dump(self) -> bytes:
+        """Run `py-spy dump` for the traced process and return its output."""
+        dump = await asyncio.create_subprocess_exec(
+            *self.py_spy_command,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+        )
+        stdout, stderr = await dump.communicate()
+        if dump.returncode != 0:
+            raise RuntimeError(stderr.decode("utf-8", "replace").strip())
+        return stdout
+
+    def parse_py_spy_dump(self, py_spy_output: bytes) -> str:
+        """
+        Parses the JSON output of `py-spy dump --json` and returns the
+        function name, in which the execution is currently in progress.
+
+        Active threads are preferred over idle ones, so the thread that is
+        actually doing work gets the sample.
+
+        Args:
+            py_spy_output (bytes): Output of `py-spy dump --json`.
+
+        Returns:
+            str: Name of Python-function that currently running.
+        """
+        fallback: Optional[str] = None
+
+        for thread in json.loads(py_spy_output):
+            frames = thread.get("frames")
+            if not frames:
+                continue
+            # py-spy lists frames from the innermost one.
+            if thread.get("active"):
+                return frames[0]["name"]
+            if fallback is None:
+                fallback = frames[0]["name"]
+
+        if fallback is not None:
+            return fallback
         return "No function detected."
 
-    def get_samples(self) -> List[Dict[float, str]]:
-        with self.samples_lock:
-            return self.samples.copy()
+
+class ProcessMemorySampler(Sampler):
+    """
+    Sampler that reads the running function straight from memory of the
+    traced process, the same way py-spy does.
+
+    `_PyRuntime` of the traced interpreter is found once, then every sample
+    walks `_PyRuntime -> PyInterpreterState -> PyThreadState -> frame ->
+    f_code -> co_name` with `process_vm_readv` calls. The traced process is
+    never stopped and no helper process is spawned.
+    """
+
+    # Upper bound of threads walked per sample, protects from looping over
+    # a list that is being modified.
+    MAX_THREADS = 1024
+    # Upper bound of function name length, protects from reading garbage.
+    MAX_NAME_LENGTH = 1024
+
+    async def start_debugger_session(self) -> None:
+        self.runtime_address, version = find_python_runtime(self.pid_to_trace)
+        self.offsets = PYTHON_OFFSETS.get(version)
+        if self.offsets is None:
+            supported = ", ".join(f"{major}.{minor}"
+                                  for major, minor in PYTHON_OFFSETS)
+            raise RuntimeError(f"Python {version[0]}.{version[1]} is not "
+                               "supported by this backend. Supported "
+                               f"versions: {supported}.")
+
+    async def get_name_of_running_function(self) -> Tuple[float, str]:
+        """
+        Read name of the function that is running in the main thread of the
+        traced process.
+
+        Returns:
+            (Tuple[float, str]): A tuple with:
+                timestamp of sampling (float)
+                name of the currently running function (str)
+        """
+        timestamp = time.time()
+
+        try:
+            function_name = self.read_running_function()
+        except (OSError, RuntimeError) as e:
+            print(f"Error capturing sample from process memory: {e}")
+            function_name = "Unknown"
+
+        return timestamp, function_name
+
+    def read_running_function(self) -> str:
+        pid = self.pid_to_trace
+        offsets = self.offsets
+
+        interpreter = read_pointer(
+            pid, self.runtime_address + offsets.interpreters_head
+        )
+        if not interpreter:
+            return "No function detected."
+
+        # The main thread is the first created one, i.e. the last one in the
+        # list of threads. Use it if it runs Python code, otherwise any
+        # thread that does.
+        frame = 0
+        thread = read_pointer(pid, interpreter + offsets.tstate_head)
+        for _ in range(self.MAX_THREADS):
+            if not thread:
+                break
+            frame = read_pointer(pid, thread + offsets.tstate_frame) or frame
+            thread = read_pointer(pid, thread + offsets.tstate_next)
+
+        if not frame:
+            return "No function detected."
+
+        code = read_pointer(pid, frame + offsets.frame_code)
+        name = read_pointer(pid, code + offsets.code_name)
+        return self.read_unicode(name)
+
+    def read_unicode(self, address: int) -> str:
+        """Read compact *str* object at *address* of traced process."""
+        offsets = self.offsets
+        header = read_process_memory(self.pid_to_trace, address,
+                                     offsets.ascii_data)
+        length = int.from_bytes(
+            header[offsets.unicode_length:offsets.unicode_length + 8],
+            "little"
+        )
+        # state bits: interned (2), kind (3), compact (1), ascii (1), ...
+        state = header[offsets.unicode_state]
+        kind = (state >> 2) & 0b111
+        is_compact = state & 0b100000
+        is_ascii = state & 0b1000000
+        if (not is_compact or kind not in _UNICODE_KIND_ENCODINGS
+                or length > self.MAX_NAME_LENGTH):
+            raise RuntimeError(f"Unexpected function name object at "
+                               f"{address:#x}")
+
+        data_offset = offsets.ascii_data if is_ascii else offsets.compact_data
+        data = read_process_memory(self.pid_to_trace, address + data_offset,
+                                   length * kind)
+        return data.decode(_UNICODE_KIND_ENCODINGS[kind], "replace")
+
+
+SAMPLER_BACKENDS = {
+    "py-spy": PySpySampler,
+    "lldb": LLDBSampler,
+    "lldb-api": LLDBAPISampler,
+    "procmem": ProcessMemorySampler,
+}
+
+DEFAULT_SAMPLER_BACKEND: str = "py-spy"
+
+
+def run_sampler(backend: str, pid_to_trace: int, sampling_timeout: float,
+                samples: SampleBuffer,
+                missed_deadlines: Synchronized, stop_event: Event) -> None:
+    """Entry point of the sampling process."""
+    sampler = SAMPLER_BACKENDS[backend](
+        pid_to_trace, sampling_timeout, samples, missed_deadlines, stop_event
+    )
+    sampler.start_sample_loop()
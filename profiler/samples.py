@@ -0,0 +1,120 @@
+"""Storage of samples collected by the sampler."""
+
+import multiprocessing as mp
+from multiprocessing import shared_memory
+import numpy as np
+import os
+import struct
+import sys
+import threading
+from typing import Dict, List, Tuple
+
+
+# Maximum number of samples kept by sampler. When it is reached, the oldest
+# samples are dropped. Can be tuned with PROFILER_RING_SIZE env variable.
+DEFAULT_RING_SIZE: int = 1_000_000
+RING_SIZE: int = int(os.environ.get("PROFILER_RING_SIZE", DEFAULT_RING_SIZE))
+
+# Sampling process is forked, so it starts sampling without importing the
+# profiler again.
+MP_CONTEXT = mp.get_context("fork")
+
+# Sample record in ring buffer: timestamp (f64), function id (u32), padding.
+_SAMPLE_STRUCT = struct.Struct("<dII")
+SAMPLE_DTYPE = np.dtype([("timestamp", "<f8"), ("function_id", "<u4"),
+                         ("pad", "<u4")])
+
+
+class SampleBuffer:
+    """
+    Bounded ring buffer of (timestamp, function) samples shared between the
+    sampling process (the only writer) and the profiler controller (reader).
+
+    Samples are fixed-size records in shared memory, and the number of
+    written samples is published in *self.head* after the record is written,
+    so readers never block the writer. Function names are sent to readers
+    once, when a new function is sampled for the first time.
+    """
+
+    def __init__(self, capacity: int = RING_SIZE):
+        self.capacity = capacity
+        # Pages of shared memory are allocated by OS on first write, so
+        # memory grows with number of samples until buffer is full.
+        self.shared_memory = shared_memory.SharedMemory(
+            create=True, size=capacity * _SAMPLE_STRUCT.size
+        )
+        self.ring = self.shared_memory.buf
+        self.head = MP_CONTEXT.Value("Q", 0, lock=False)
+        self.new_functions = MP_CONTEXT.SimpleQueue()
+
+        # Writer side: function ids by names.
+        self.function_ids: Dict[str, int] = {}
+
+        # Reader side: function names indexed by id.
+        self.function_table: List[str] = []
+        self.reader_lock = threading.Lock()
+
+    def add_sample(self, timestamp: float, function_name: str) -> None:
+        """
+        Write sample to ring buffer, overwriting the oldest sample when buffer
+        is full. Must be called from a single process only.
+        """
+        function_id = self.function_ids.get(function_name)
+        if function_id is None:
+            function_id = len(self.function_ids)
+            self.function_ids[function_name] = function_id
+            # SimpleQueue writes to pipe synchronously, so the name is
+            # available to readers before any sample with its id.
+            self.new_functions.put(function_name)
+
+        head = self.head.value
+        _SAMPLE_STRUCT.pack_into(
+            self.ring, (head % self.capacity) * _SAMPLE_STRUCT.size,
+            timestamp, function_id, 0
+        )
+        self.head.value = head + 1
+
+    def read_samples(self, start: int = 0
+                     ) -> Tuple[np.ndarray, np.ndarray, List[str], int]:
+        """
+        Return copies of timestamps and function ids of samples written
+        since *start*-th sample, the table of function names indexed by id
+        and the number of written samples to read from next time.
+
+        Samples already overwritten by newer ones are skipped.
+        """
+        with self.reader_lock:
+            head = self.head.value
+            while not self.new_functions.empty():
+                self.function_table.append(
+                    sys.intern(self.new_functions.get())
+                )
+            function_table = self.function_table.copy()
+
+        records = np.frombuffer(self.ring, dtype=SAMPLE_DTYPE,
+                                count=self.capacity)
+        first = max(start, head - self.capacity)
+        i = first % self.capacity
+        end = i + head - first
+        if end <= self.capacity:
+            samples = records[i:end].copy()
+        else:
+            samples = np.concatenate((records[i:],
+                                      records[:end - self.capacity]))
+
+        # Samples that writer has overwritten while they were copied are
+        # dropped. Writer packs the next record before publishing it, so the
+        # slot it may be writing right now is dropped too.
+        overwritten = self.head.value + 1 - self.capacity - first
+        if overwritten > 0:
+            samples = samples[overwritten:]
+
+        return (samples["timestamp"], samples["function_id"], function_table,
+                head)
+
+    def unlink(self) -> None:
+        """
+        Remove shared memory of ring buffer. Samples can still be read by
+        processes that use the buffer, memory is freed when all of them exit.
+        """
+        self.shared_memory.unlink()
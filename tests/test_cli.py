@@ -0,0 +1,52 @@
+import contextlib
+import io
+import unittest
+
+from cli import build_args_parser, parse_command
+
+
+class ParseCommandTest(unittest.TestCase):
+    def setUp(self):
+        self.parser, self.command_parsers = build_args_parser()
+
+    def parse(self, user_input):
+        return parse_command(user_input, self.parser, self.command_parsers)
+
+    def assertParseError(self, user_input):
+        stderr = io.StringIO()
+        with self.assertRaises(SystemExit) as exit_info, \
+                contextlib.redirect_stderr(stderr):
+            self.parse(user_input)
+
+        self.assertNotEqual(exit_info.exception.code, 0)
+        return stderr.getvalue()
+
+    def test_start(self):
+        args = self.parse("start -p 42 -f foo bar -t 0.5 -b procmem")
+
+        self.assertEqual(args.command, "start")
+        self.assertEqual(args.pid, 42)
+        self.assertEqual(args.func, ["foo", "bar"])
+        self.assertEqual(args.timeout, 0.5)
+        self.assertEqual(args.backend, "procmem")
+
+    def test_command_without_arguments(self):
+        self.assertEqual(self.parse("results").command, "results")
+
+    def test_add(self):
+        args = self.parse("add -f foo")
+
+        self.assertEqual(args.command, "add")
+        self.assertEqual(args.func, ["foo"])
+
+    def test_invalid_arguments(self):
+        self.assertIn("usage: ", self.assertParseError("add"))
+
+    def test_unknown_command_is_parsed_by_full_parser(self):
+        error = self.assertParseError("unknown -f foo")
+
+        self.assertIn("invalid choice: 'unknown'", error)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,56 @@
+import contextlib
+import io
+import unittest
+
+from profiler.controller import ProfilerController
+from profiler.samples import SampleBuffer
+
+
+class UpdateFunctionCountsTest(unittest.TestCase):
+    def setUp(self):
+        self.controller = ProfilerController()
+        self.samples = SampleBuffer(capacity=16)
+        self.addCleanup(self.samples.shared_memory.close)
+        self.addCleanup(self.samples.unlink)
+        self.controller.samples = self.samples
+
+    def add_samples(self, *function_names):
+        for i, function_name in enumerate(function_names):
+            self.samples.add_sample(float(i), function_name)
+
+    def counts(self):
+        return dict(zip(self.controller.function_table,
+                        self.controller.function_counts.tolist()))
+
+    def test_counts_are_updated_incrementally(self):
+        self.add_samples("a", "b", "a")
+        self.controller.update_function_counts()
+        self.assertEqual(self.counts(), {"a": 2, "b": 1})
+
+        self.controller.update_function_counts()
+        self.assertEqual(self.counts(), {"a": 2, "b": 1})
+
+        self.add_samples("c", "a")
+        self.controller.update_function_counts()
+        self.assertEqual(self.counts(), {"a": 3, "b": 1, "c": 1})
+        self.assertEqual(self.controller.samples_read, 5)
+
+    def test_functions_added_after_sampling_get_earlier_samples(self):
+        with contextlib.redirect_stdout(io.StringIO()):
+            self.controller.add_functions_to_profile(["a"])
+        self.add_samples("a", "b", "b")
+        self.controller.update_function_counts()
+
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            self.controller.add_functions_to_profile(["b"])
+            self.controller.print_results()
+
+        dt = self.controller.sampling_timeout
+        self.assertIn("%.4f ± %.4f" % (dt, dt), output.getvalue())
+        self.assertIn("%.4f ± %.4f" % (2 * dt, 2 ** 0.5 * dt),
+                      output.getvalue())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,37 @@
+import ctypes
+import os
+import sys
+import unittest
+
+from profiler.process_memory import (
+    find_elf_symbol, find_python_runtime, read_pointer, read_process_memory
+)
+
+
+class ProcessMemoryTest(unittest.TestCase):
+    def test_find_python_runtime_of_own_process(self):
+        runtime = ctypes.c_char.in_dll(ctypes.pythonapi, "_PyRuntime")
+
+        address, version = find_python_runtime(os.getpid())
+
+        self.assertEqual(address, ctypes.addressof(runtime))
+        self.assertEqual(version, sys.version_info[:2])
+
+    def test_find_elf_symbol_missing(self):
+        self.assertIsNone(find_elf_symbol(os.readlink("/proc/self/exe"),
+                                          "no_such_symbol_in_python"))
+
+    def test_find_elf_symbol_not_elf(self):
+        self.assertIsNone(find_elf_symbol(__file__, "_PyRuntime"))
+
+    def test_read_own_memory(self):
+        value = ctypes.c_uint64(0x0123456789abcdef)
+        address = ctypes.addressof(value)
+
+        self.assertEqual(read_process_memory(os.getpid(), address, 8),
+                         bytes(value))
+        self.assertEqual(read_pointer(os.getpid(), address), value.value)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,72 @@
+import json
+import unittest
+
+from profiler.sampler import LLDBSampler, PySpySampler
+
+
+class ParsePythonStackTest(unittest.TestCase):
+    def setUp(self):
+        self.sampler = LLDBSampler(1, 0.02, None, None, None)
+
+    def test_returns_innermost_frame(self):
+        output = (b' py-leaf-frame\n'
+                  b'  File "/app/test.py", line 30, in <module>\n'
+                  b'  File "/app/test.py", line 10, in heavy_computation\n')
+
+        self.assertEqual(self.sampler.parse_python_stack(output),
+                         "heavy_computation")
+
+    def test_strips_crlf_line_endings(self):
+        output = (b' py-leaf-frame\r\n'
+                  b'  File "/app/test.py", line 22, in disk_io\r\n')
+
+        self.assertEqual(self.sampler.parse_python_stack(output), "disk_io")
+
+    def test_skips_trailing_frame_fragment(self):
+        output = (b'  File "/app/test.py", line 28, in network_request\n'
+                  b'  File "')
+
+        self.assertEqual(self.sampler.parse_python_stack(output),
+                         "network_request")
+
+    def test_no_frame(self):
+        output = b' py-leaf-frame\nNo Python traceback found\n'
+
+        self.assertEqual(self.sampler.parse_python_stack(output),
+                         "No function detected.")
+
+
+class ParsePySpyDumpTest(unittest.TestCase):
+    def setUp(self):
+        self.sampler = PySpySampler(1, 0.02, None, None, None)
+
+    @staticmethod
+    def thread(active, *names):
+        return {"active": active,
+                "frames": [{"name": name} for name in names]}
+
+    def test_prefers_active_thread(self):
+        output = json.dumps([
+            self.thread(False, "wait", "worker"),
+            self.thread(True, "heavy_computation", "<module>"),
+        ]).encode()
+
+        self.assertEqual(self.sampler.parse_py_spy_dump(output),
+                         "heavy_computation")
+
+    def test_falls_back_to_first_idle_thread(self):
+        output = json.dumps([
+            {"active": True, "frames": []},
+            self.thread(False, "disk_io", "<module>"),
+            self.thread(False, "wait", "worker"),
+        ]).encode()
+
+        self.assertEqual(self.sampler.parse_py_spy_dump(output), "disk_io")
+
+    def test_no_frames(self):
+        self.assertEqual(self.sampler.parse_py_spy_dump(b"[]"),
+                         "No function detected.")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,32 @@
+import unittest
+
+from profiler.samples import _SAMPLE_STRUCT, SampleBuffer
+
+
+class SampleBufferTest(unittest.TestCase):
+    def setUp(self):
+        self.samples = SampleBuffer(capacity=4)
+        self.addCleanup(self.samples.shared_memory.close)
+        self.addCleanup(self.samples.unlink)
+
+    def test_read_samples_skips_unpublished_record(self):
+        for i in range(8):
+            self.samples.add_sample(float(i), "a")
+
+        # Writer is in the middle of *add_sample* of a new function: record
+        # 8 is packed into the slot of record 4, but head is not published.
+        self.samples.function_ids["b"] = 1
+        _SAMPLE_STRUCT.pack_into(self.samples.ring, 0, 8.0, 1, 0)
+
+        timestamps, function_ids, function_table, head = (
+            self.samples.read_samples(4)
+        )
+
+        self.assertEqual(timestamps.tolist(), [5.0, 6.0, 7.0])
+        self.assertEqual(function_ids.tolist(), [0, 0, 0])
+        self.assertEqual(function_table, ["a"])
+        self.assertEqual(head, 8)
+
+
+if __name__ == "__main__":
+    unittest.main()